@@ -3,107 +3,732 @@ import sys
 import subprocess
 import hashlib
 import zipfile
+import mmap
 import json
+import logging
 import shutil
 import datetime
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import psutil
+try:
+    import fcntl
+except ImportError:  # Windows; only used next to os.copy_file_range (Linux)
+    fcntl = None
+try:
+    import xxhash
+except ImportError:  # optional, fastest of the content hashers
+    xxhash = None
+try:
+    import blake3
+except ImportError:  # optional, hashlib's blake2b is used instead
+    blake3 = None
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QFileDialog, QProgressBar,
     QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget, QHeaderView,
-    QHBoxLayout, QLabel, QCheckBox, QComboBox, QInputDialog, QMessageBox
+    QHBoxLayout, QLabel, QCheckBox, QComboBox, QInputDialog, QMessageBox,
+    QToolTip, QStyledItemDelegate
+)
+from PyQt5.QtGui import (
+    QColor, QBrush, QImage, QImageReader, QPixmap, QPixmapCache, QCursor
+)
+from PyQt5.QtCore import (
+    Qt, QThread, pyqtSignal, QEvent, QBuffer, QByteArray, QIODevice,
+    QObject, QRunnable, QThreadPool, QSize, QTimer
 )
-from PyQt5.QtGui import QColor, QBrush
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+
+log = logging.getLogger(__name__)
 
 # --- Configuration ----------------------------------------------------------
 
+# Unset variables are dropped: an empty entry would match every path
 EXCLUDED_DIRS = [
-    os.environ.get('SystemRoot', 'C:/Windows'),
-    os.environ.get('ProgramFiles', 'C:/Program Files'),
-    os.environ.get('ProgramFiles(x86)', 'C:/Program Files (x86)'),
-    os.environ.get('APPDATA', ''),
-    os.environ.get('LOCALAPPDATA', '')
+    os.path.normcase(os.path.normpath(p)) for p in (
+        os.environ.get('SystemRoot', 'C:/Windows'),
+        os.environ.get('ProgramFiles', 'C:/Program Files'),
+        os.environ.get('ProgramFiles(x86)', 'C:/Program Files (x86)'),
+        os.environ.get('APPDATA', ''),
+        os.environ.get('LOCALAPPDATA', '')
+    ) if p
 ]
+EXCLUDED_SET = frozenset(EXCLUDED_DIRS)
 
-COMMON_EXTENSIONS = [
+COMMON_EXTENSIONS = frozenset([
     '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff',
     '.zip', '.rar', '.7z', '.exe', '.msi', '.dmg', '.pkg',
     '.pdf', '.docx', '.pptx', '.xls', '.xlsx', '.txt',
     '.psd', '.ai', '.svg', '.blend', '.skp', '.cad',
     '.sldprt', '.sldasm'
-]
+])
+
+# Image types previewed in the filename tooltip, and the preview width
+PREVIEW_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp'})
+PREVIEW_WIDTH = 200
+
+# Formats that still shrink under DEFLATE; everything else is already
+# compressed (images, archives, Office XML, PDFs...) and is stored as-is
+COMPRESSIBLE_EXTENSIONS = frozenset([
+    '.txt', '.csv', '.log', '.xml', '.json', '.svg', '.bmp', '.xls',
+    '.cad', '.sldprt', '.sldasm', '.stl', '.step', '.stp', '.iges', '.igs'
+])
+
+# Digests of previously hashed files, keyed by path and validated by size+mtime
+HASH_CACHE_PATH = os.path.expanduser('~/.cache/spacesaver/hashes.db')
+
+# Item data role flagging a duplicate row (set on the size cell)
+DUP_ROLE = Qt.UserRole + 1
+
+# Minimum seconds between progress signals (~30 Hz)
+PROGRESS_INTERVAL = 1 / 30
+
+# Same-size buckets are packed into one hashing task up to this many bytes
+TASK_BYTES = 1024 * 1024
+
+# Rows per batch_ready signal; one table resize per batch instead of per file
+ROW_BATCH = 500
+
+# Bytes read per file for the quick pre-hash of same-size duplicate candidates
+HEAD_BYTES = 4096  # one page: a single small read
+# Above this the quick pre-hash also covers the last HEAD_BYTES
+TAIL_HASH_MIN = 1024 * 1024
+# Read size for streamed hashing; large reads keep per-chunk overhead negligible
+HASH_CHUNK = 4 * 1024 * 1024
+# Raw, non-translating reads for hashing (O_BINARY only exists on Windows)
+READ_FLAGS = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+# Files above this are hashed through mmap; smaller ones take a single read
+MMAP_HASH_MIN = 64 * 1024
+# Files above this are hashed by BLAKE3's multithreaded mmap path when available
+BLAKE3_MMAP_MIN = 4 * 1024 * 1024
+# Files above this are evicted from the page cache once hashed
+DROP_CACHE_MIN = 64 * 1024 * 1024
+
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
 
 def human_readable_size(size):
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if size < 1024.0:
-            return f"{size:.2f} {unit}"
-        size /= 1024.0
-    return f"{size:.2f} PB"
-
-class SizeItem(QTableWidgetItem):
-    """Sort sizes correctly by converting to bytes."""
+    # Every 10 bits of the byte count is one step of 1024
+    unit = min(max(int(size).bit_length() - 1, 0) // 10, len(SIZE_UNITS) - 1)
+    return f"{size / (1 << unit * 10):.2f} {SIZE_UNITS[unit]}"
+
+def zip_write(zf, path, arc, store=False):
+    """Add path to zf, deflating (fast level) only formats that benefit.
+
+    Same as zf.write(), but copies in HASH_CHUNK blocks instead of 8 KiB.
+    With store, nothing is deflated and archiving runs at disk speed.
+    """
+    # zip dates start at 1980; clamp older mtimes rather than raise ValueError
+    zinfo = zipfile.ZipInfo.from_file(path, arc, strict_timestamps=False)
+    if not store and os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        zinfo._compresslevel = 1  # what zf.write(compresslevel=1) sets
+    else:
+        zinfo.compress_type = zipfile.ZIP_STORED
+    with open(path, 'rb', buffering=0) as src, zf.open(zinfo, 'w') as dst:
+        shutil.copyfileobj(src, dst, HASH_CHUNK)
+
+def build_zip(out, files, store=False):
+    """Archive files into a new zip at out with a manifest of original paths.
+
+    Originals are removed only once the zip is closed; returns those paths.
+    """
+    seen = set(); man = {}
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i, f in enumerate(files):
+            name = os.path.basename(f)
+            arc = name if name not in seen else f"{i}_{name}"
+            seen.add(arc)
+            try:
+                zip_write(zf, f, arc, store)
+            except OSError as e:
+                log.warning("could not archive %s: %s", f, e)
+                continue
+            man[arc] = f
+        zf.writestr("manifest.json", json.dumps(man, indent=2))
+    for f in man.values():
+        os.remove(f)
+    return list(man.values())
+
+def extract_zip(zip_path, dest):
+    """extractall(), with entries decompressed and written in parallel.
+
+    A ZipFile handle can't be shared between threads, so each worker
+    opens its own.
+    """
+    local = threading.local()
+    handles = []
+
+    def extract(info):
+        zf = getattr(local, 'zf', None)
+        if zf is None:
+            zf = local.zf = zipfile.ZipFile(zip_path)
+            handles.append(zf)
+        try:
+            zf.extract(info, dest)
+        except FileExistsError:
+            zf.extract(info, dest)  # another worker made the parent dir first
+
+    with zipfile.ZipFile(zip_path) as zf:
+        infos = zf.infolist()
+    try:
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+            list(pool.map(extract, infos))
+    finally:
+        for zf in handles:
+            zf.close()
+
+# ioctl from linux/fs.h: make dst share src's extents (btrfs, XFS)
+FICLONE = 0x40049409
+
+def fast_copy(src, dst):
+    """copy_function for shutil.move: reflink or in-kernel copy on Linux."""
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                try:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                except OSError:
+                    while os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1 << 30):
+                        pass
+                # Some kernel/filesystem pairs report 0 before the end across
+                # filesystems; shutil.move deletes the source, so verify
+                complete = (os.fstat(fdst.fileno()).st_size
+                            == os.fstat(fsrc.fileno()).st_size)
+            if complete:
+                shutil.copystat(src, dst)
+                return dst
+        except OSError:
+            pass
+    return shutil.copy2(src, dst)
+
+# Duplicate fingerprints need no cryptographic strength, just speed
+HASH_NAME = 'xxh3_128' if xxhash else 'blake3' if blake3 else 'blake2b'
+
+if sys.platform.startswith('win'):
+    open_folder = os.startfile
+else:
+    FOLDER_OPENER = 'open' if sys.platform.startswith('darwin') else 'xdg-open'
+
+    def open_folder(path):
+        """Show path in the file manager, detached from our session and pipes."""
+        subprocess.Popen([FOLDER_OPENER, path], stdin=subprocess.DEVNULL,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+
+def new_hasher():
+    """Content hasher for duplicate fingerprints, per HASH_NAME."""
+    if HASH_NAME == 'xxh3_128':
+        return xxhash.xxh3_128()
+    if HASH_NAME == 'blake3':
+        return blake3.blake3()
+    return hashlib.blake2b(digest_size=16)
+
+_thread_local = threading.local()
+
+def read_buffer():
+    """This thread's reusable HASH_CHUNK read buffer, as a memoryview."""
+    buf = getattr(_thread_local, 'buf', None)
+    if buf is None:
+        buf = _thread_local.buf = memoryview(bytearray(HASH_CHUNK))
+    return buf
+
+def hash_head(path, size):
+    """blake2b of the first HEAD_BYTES of path, and of the last for large files."""
+    fd = os.open(path, READ_FLAGS)
+    try:
+        hasher = hashlib.blake2b(os.read(fd, HEAD_BYTES), digest_size=16)
+        if size > TAIL_HASH_MIN:
+            # Same-format files often share a header but not an ending
+            os.lseek(fd, size - HEAD_BYTES, os.SEEK_SET)
+            hasher.update(os.read(fd, HEAD_BYTES))
+        return hasher.hexdigest()
+    finally:
+        os.close(fd)
+
+def hash_file(path, size):
+    """Full-content fingerprint of path, whose size the caller already knows."""
+    if HASH_NAME == 'blake3' and size > BLAKE3_MMAP_MIN:
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        hasher.update_mmap(path)
+        if size >= DROP_CACHE_MIN:
+            fd = os.open(path, READ_FLAGS)
+            try:
+                drop_page_cache(fd)
+            finally:
+                os.close(fd)
+        return hasher.hexdigest()
+    hasher = new_hasher()
+    # Raw fd: reads are already large, a file object would only add layers
+    fd = os.open(path, READ_FLAGS)
+    try:
+        if size <= MMAP_HASH_MIN:
+            # The size is known, so one read and no EOF probe
+            hasher.update(os.read(fd, size))
+            return hasher.hexdigest()
+        # One update over the mapping; the kernel reads ahead for us
+        try:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                hasher.update(mm)
+            return hasher.hexdigest()
+        except OSError:
+            pass  # filesystem can't mmap, stream it instead
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        # Read into this thread's buffer rather than a new bytes per chunk
+        buf = read_buffer()
+        with open(fd, 'rb', buffering=0, closefd=False) as f:
+            while n := f.readinto(buf):
+                hasher.update(buf[:n])
+    finally:
+        if size >= DROP_CACHE_MIN:
+            drop_page_cache(fd)
+        os.close(fd)
+    return hasher.hexdigest()
+
+def drop_page_cache(fd):
+    """Let the kernel evict fd's pages: a scan reads each big file only once."""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+def io_workers(folder):
+    """Threads for walking and hashing on folder's device.
+
+    Concurrent reads only pay off on SSDs; on a spinning disk they turn one
+    sequential stream into seeks, so rotational devices get two workers.
+    """
+    try:
+        dev = os.stat(folder).st_dev
+        # Partitions have no queue of their own; it lives on the parent disk
+        base = os.path.realpath('/sys/dev/block/%d:%d' % (os.major(dev), os.minor(dev)))
+        for d in (base, os.path.dirname(base)):
+            try:
+                with open(os.path.join(d, 'queue', 'rotational')) as f:
+                    if f.read().strip() == '1':
+                        return 2
+                    break
+            except OSError:
+                pass
+    except (OSError, AttributeError):
+        pass  # no sysfs (or os.major) here; assume solid state
+    return min(32, (os.cpu_count() or 1) * 4)
+
+class SortItem(QTableWidgetItem):
+    """Sort by the raw value in Qt.UserRole (bytes, epoch seconds), not the text."""
     def __lt__(self, other):
-        def to_bytes(text):
-            num, unit = text.split()
-            factor = {'B':1,
-                      'KB':1024,
-                      'MB':1024**2,
-                      'GB':1024**3,
-                      'TB':1024**4}
-            return float(num) * factor.get(unit, 1)
-        return to_bytes(self.text()) < to_bytes(other.text())
+        return self.data(Qt.UserRole) < other.data(Qt.UserRole)
+
+# --- Hash cache -------------------------------------------------------------
+
+class HashCache:
+    """Head/full hashes from earlier scans, reused while size and mtime match.
+
+    sqlite connections belong to the thread that opened them, so the scanner
+    thread loads the rows it needs up front, hash workers only touch the
+    in-memory copy, and new digests are written back in one go by save().
+    Each content hasher gets its own table, so switching backends neither
+    mixes digests nor throws away the other backend's rows. Paths are keyed
+    as os.fsencode() bytes: names that aren't valid UTF-8 can't bind as text.
+    """
+    COLUMNS = {'head': 2, 'hash': 3}
+    VERSION = 4  # bump when the schema or the meaning of a stored digest changes
+    TABLE = 'h_' + HASH_NAME
+
+    def __init__(self, path=None):
+        self.rows = {}
+        self.dirty = set()
+        self._lock = threading.Lock()
+        self.db = None  # no path, or unwritable home etc.: scan without a cache
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.db = sqlite3.connect(path)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            if self.db.execute("PRAGMA user_version").fetchone()[0] != self.VERSION:
+                stale = self.db.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+                for (name,) in stale:
+                    self.db.execute('DROP TABLE "%s"' % name)
+                self.db.execute("PRAGMA user_version=%d" % self.VERSION)
+            self.db.execute("CREATE TABLE IF NOT EXISTS %s("
+                            "path BLOB PRIMARY KEY, size INTEGER, mtime INTEGER,"
+                            " head TEXT, hash TEXT)" % self.TABLE)
+        except (OSError, sqlite3.Error):
+            log.warning("hash cache unavailable at %s", path, exc_info=True)
+            self.db = None
+
+    def load(self, paths):
+        if self.db is None:
+            return
+        try:
+            for i in range(0, len(paths), 500):
+                chunk = [os.fsencode(p) for p in paths[i:i + 500]]
+                rows = self.db.execute(
+                    "SELECT path, size, mtime, head, hash FROM %s WHERE path IN (%s)"
+                    % (self.TABLE, ','.join('?' * len(chunk))), chunk)
+                for path, *row in rows:
+                    self.rows[os.fsdecode(path)] = row
+        except (sqlite3.Error, ValueError):
+            log.warning("could not read hash cache", exc_info=True)
+            self.rows.clear()
+            self.db.close()
+            self.db = None
+
+    def get(self, column, path, size, mtime, compute):
+        """Cached column value for an unchanged file, else compute(path)."""
+        col = self.COLUMNS[column]
+        row = self.rows.get(path)
+        if row and row[0] == size and row[1] == mtime and row[col]:
+            return row[col]
+        value = compute(path)
+        with self._lock:
+            row = self.rows.get(path)
+            if not row or row[0] != size or row[1] != mtime:
+                row = self.rows[path] = [size, mtime, None, None]
+            row[col] = value
+            self.dirty.add(path)
+        return value
+
+    def prune(self, folder, seen):
+        """Forget cached files under folder that the last full walk did not see."""
+        if self.db is None:
+            return
+        # Range over the primary key instead of LIKE, which can't use it;
+        # keys are fsencode()d like load/save, so the bounds are bytes too
+        try:
+            lo = os.fsencode(os.path.join(folder, ''))
+            hi = lo[:-1] + bytes([lo[-1] + 1])
+            with self.db:
+                gone = [(path,) for (path,) in self.db.execute(
+                    "SELECT path FROM %s WHERE path >= ? AND path < ?"
+                    % self.TABLE, (lo, hi)) if os.fsdecode(path) not in seen]
+                self.db.executemany(
+                    "DELETE FROM %s WHERE path = ?" % self.TABLE, gone)
+        except (sqlite3.Error, ValueError):
+            log.warning("could not prune hash cache", exc_info=True)
+
+    def save(self):
+        if self.db is None:
+            return
+        try:
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO %s VALUES (?, ?, ?, ?, ?)" % self.TABLE,
+                    [(os.fsencode(path), *self.rows[path]) for path in self.dirty])
+        except (sqlite3.Error, ValueError):
+            log.warning("could not save hash cache", exc_info=True)
+        self.dirty.clear()
+        self.db.close()
+
+class DupDelegate(QStyledItemDelegate):
+    """Paint duplicate rows from one flag instead of a brush per cell."""
+    brush = QBrush(QColor("#800000"))
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        if index.sibling(index.row(), 3).data(DUP_ROLE):
+            option.backgroundBrush = self.brush
 
 # --- File scanning thread ---------------------------------------------------
 
 class FileScanner(QThread):
     progress    = pyqtSignal(int)
-    file_found  = pyqtSignal(str, int, str, str, str)
+    started_rows = pyqtSignal(int)
+    batch_ready = pyqtSignal(list)
     finished    = pyqtSignal()
 
-    def __init__(self, folder, extensions):
+    def __init__(self, folder, extensions, use_cache=True, find_dups=True):
         super().__init__()
         self.folder = folder
-        self.extensions = extensions
+        self.extensions = frozenset(e.lower() for e in extensions) or None
+        self.use_cache = use_cache
+        self.find_dups = find_dups
         self._is_running = True
-        self.found_hashes = {}
+        self._batch = []
 
     def run(self):
-        # Walk selected folder, skip excluded
-        file_list = []
-        for root, dirs, files in os.walk(self.folder):
-            if any(root.startswith(ex) for ex in EXCLUDED_DIRS):
-                continue
-            for f in files:
-                file_list.append(os.path.join(root, f))
+        self.cache = HashCache()  # no cache until scan() opens one
+        try:
+            self.scan()
+        except Exception:
+            # A thread has no caller to report to; keep what was found so far
+            log.exception("scan of %s failed", self.folder)
+        finally:
+            # Always hand over the rows found and let the UI leave its
+            # scanning state, whatever happened above
+            self.cache.save()
+            self.flush_batch()
+            if self._is_running:
+                self.progress.emit(100)
+            self.finished.emit()
+
+    def scan(self):
+        self.workers = io_workers(self.folder)
+        # Bucket candidates by size as the walk yields them
+        size_map = {}
+        for path, name, st in self.iter_candidates():
+            size_map.setdefault(st.st_size, []).append((path, name, st.st_mtime_ns))
+        # Every candidate becomes a row; let the table allocate them at once
+        self.started_rows.emit(sum(len(files) for files in size_map.values()))
+
+        # Only files sharing a size can be duplicates, so unique sizes are
+        # never read; progress tracks bytes accounted for, not file count.
+        # Same-size buckets are independent and hashed on a thread pool.
+        # With duplicate detection off nothing is read at all.
+        self._total = sum(size * len(files) for size, files in size_map.items())
+        self._done = 0
+        self._last_pct = -1
+        self._last_emit = 0.0
+        self.cache = HashCache(HASH_CACHE_PATH if self.use_cache and self.find_dups else None)
+        self.cache.load([f[0] for files in size_map.values() if len(files) > 1 for f in files])
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {}
+            # Small buckets share a task, so per-task overhead stays
+            # negligible next to the bytes each task hashes
+            batch, batch_bytes = [], 0
+            for size, files in size_map.items():
+                if not self._is_running:
+                    break
+                if len(files) > 1 and self.find_dups:
+                    batch.append((size, files))
+                    batch_bytes += size * len(files)
+                    if batch_bytes >= TASK_BYTES:
+                        pending[pool.submit(self.find_batch, batch)] = batch
+                        batch, batch_bytes = [], 0
+                elif self._is_running:
+                    self.emit_bucket(size, files, {})
+            if batch and self._is_running:
+                pending[pool.submit(self.find_batch, batch)] = batch
+            for fut in as_completed(pending):
+                if not self._is_running:
+                    # Leaving the with block would otherwise run every queued task
+                    pool.shutdown(cancel_futures=True)
+                    break
+                for (size, files), dups in zip(pending[fut], fut.result()):
+                    self.emit_bucket(size, files, dups)
+        # Deleted or renamed files would otherwise stay cached forever; only
+        # a finished, unfiltered walk knows everything under the folder
+        if self._is_running and self.extensions is None:
+            self.cache.prune(self.folder, {f[0] for files in size_map.values()
+                                           for f in files})
+
+    def iter_candidates(self):
+        """Yield (path, name, stat) for files passing the extension filter.
+
+        Directories are listed concurrently so stat latency overlaps; each
+        kept file is stat'ed once through its DirEntry, and excluded dirs
+        are pruned before descending.
+        """
+        exts = self.extensions
+
+        def list_dir(root):
+            dirs, files = [], []
+            try:
+                with os.scandir(root) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if os.path.normcase(entry.path) not in EXCLUDED_SET:
+                                    dirs.append(entry.path)
+                                continue
+                            if not entry.is_file(follow_symlinks=False):
+                                continue
+                            if exts:
+                                name = entry.name
+                                dot = name.rfind('.')
+                                if (name[dot:].lower() if dot > 0 else '') not in exts:
+                                    continue
+                            files.append((entry.path, entry.name,
+                                          entry.stat(follow_symlinks=False)))
+                        except OSError:
+                            continue
+            except OSError:
+                pass
+            return dirs, files
+
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        pending = {pool.submit(list_dir, self.folder)}
+        try:
+            while pending and self._is_running:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    dirs, files = fut.result()
+                    pending.update(pool.submit(list_dir, d) for d in dirs)
+                    yield from files
+        finally:
+            for fut in pending:
+                fut.cancel()
+            pool.shutdown()
+
+    def emit_bucket(self, size, files, dups):
+        for path, name, mtime in files:
+            dot = name.rfind('.')
+            ext = name[dot:].lower() if dot > 0 else ''
+            self._batch.append((name, ext, size, path, 'No', dups.get(path, ''), mtime / 1e9))
+        if len(self._batch) >= ROW_BATCH:
+            self.flush_batch()
+        self._done += size * len(files)
+        # Only signal visible changes, and no faster than the screen can show
+        pct = int(self._done / self._total * 100) if self._total else 100
+        now = time.monotonic()
+        if pct != self._last_pct and now - self._last_emit >= PROGRESS_INTERVAL:
+            self._last_pct, self._last_emit = pct, now
+            self.progress.emit(pct)
+
+    def flush_batch(self):
+        if self._batch:
+            self.batch_ready.emit(self._batch)
+            self._batch = []
+
+    def find_batch(self, buckets):
+        """find_duplicates over several (size, files) buckets in one task.
+
+        Once the scan is stopped the remaining buckets get empty results
+        instead of being read.
+        """
+        results = []
+        for size, files in buckets:
+            results.append(self.find_duplicates(files, size)
+                           if self._is_running else {})
+        return results
+
+    def find_duplicates(self, files, size):
+        """Map each duplicate in a same-size group to the first copy by path."""
+        if not self._is_running:
+            return {}
+        # The parallel walk fills buckets in completion order; sort so the
+        # copy reported as the original is the same on every rescan
+        paths = sorted(path for path, _, _ in files)
+        if size == 0:
+            # Empty files are all identical; no need to open them
+            return {path: paths[0] for path in paths[1:]}
+        mtimes = {path: mtime for path, _, mtime in files}
+        head_of = lambda p: self.cache.get('head', p, size, mtimes[p],
+                                           lambda p: hash_head(p, size))
+        full_of = lambda p: self.cache.get('hash', p, size, mtimes[p],
+                                           lambda p: hash_file(p, size))
+        # Equal content implies equal size, so first copies are tracked per
+        # bucket: no lock, and nothing is kept once the bucket is done
+        first = {}
+        dups = {}
+        # A cheap head (and, for large files, tail) hash splits most groups;
+        # files that fit in the head block are already fully compared by it
+        for head, group in self.group_by(paths, head_of):
+            for path in group:
+                if not self._is_running:
+                    return dups
+                try:
+                    h = head if size <= HEAD_BYTES else full_of(path)
+                except (OSError, ValueError) as e:  # unreadable, or shrank under mmap
+                    log.debug("skipping %s: %s", path, e)
+                    continue
+                dup = first.setdefault(h, path)
+                if dup != path:
+                    dups[path] = dup
+        return dups
+
+    def group_by(self, paths, key):
+        """Group paths by key(path), keeping only (key, group) with 2+ members.
 
-        total = len(file_list)
-        for idx, path in enumerate(file_list):
+        Nothing is returned once the scan is stopped, so a cancelled bucket
+        does no further reads.
+        """
+        groups = {}
+        for path in paths:
             if not self._is_running:
-                break
+                return []
             try:
-                size = os.path.getsize(path)
-                ext = os.path.splitext(path)[1].lower()
-                if not self.extensions or ext in self.extensions:
-                    with open(path, 'rb') as fp:
-                        h = hashlib.sha256(fp.read()).hexdigest() if size > 0 else ''
-                    dup = self.found_hashes.get(h, '')
-                    if not dup:
-                        self.found_hashes[h] = path
-                    self.file_found.emit(
-                        os.path.basename(path),
-                        size,
-                        path,
-                        'No',
-                        dup
-                    )
-            except:
+                groups.setdefault(key(path), []).append(path)
+            except OSError:
                 pass
-            self.progress.emit(int((idx + 1) / total * 100))
-        self.finished.emit()
+        return [(k, g) for k, g in groups.items() if len(g) > 1]
 
     def stop(self):
         self._is_running = False
 
+# --- Move thread ------------------------------------------------------------
+
+class MoveWorker(QThread):
+    """Move files into dest off the GUI thread; reports (old, new) per file."""
+    moved = pyqtSignal(str, str)
+
+    def __init__(self, paths, dest):
+        super().__init__()
+        self.paths = paths
+        self.dest = dest
+
+    def run(self):
+        for path in self.paths:
+            try:
+                new = shutil.move(path, self.dest, copy_function=fast_copy)
+            except (OSError, shutil.Error) as e:
+                log.warning("could not move %s: %s", path, e)
+                continue
+            self.moved.emit(path, new)
+
+# --- Archive thread ---------------------------------------------------------
+
+class ArchiveWorker(QThread):
+    """Build zips off the GUI thread; independent parts are built in parallel.
+
+    zlib releases the GIL while deflating, and stored members are plain
+    copies, so threads scale across parts without a process pool.
+    """
+    part_done = pyqtSignal(str, list)  # zip path, original paths archived
+
+    def __init__(self, parts, store):
+        super().__init__()
+        self.parts = parts
+        self.store = store
+
+    def run(self):
+        workers = min(len(self.parts), os.cpu_count() or 1) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(build_zip, out, files, self.store): out
+                       for out, files in self.parts}
+            for fut in as_completed(futures):
+                try:
+                    done = fut.result()
+                except OSError as e:
+                    log.warning("could not write %s: %s", futures[fut], e)
+                    continue
+                self.part_done.emit(futures[fut], done)
+
+# --- Image previews ---------------------------------------------------------
+
+class PreviewSignals(QObject):
+    ready = pyqtSignal(str, QImage)
+
+class PreviewTask(QRunnable):
+    """Decode and scale one image preview on a pool thread.
+
+    QImage is safe to build off the GUI thread; the QPixmap conversion
+    happens in the slot connected to signals.ready.
+    """
+    def __init__(self, path, signals):
+        super().__init__()
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        # Ask the decoder for the preview size directly; JPEG in particular
+        # then decodes at a fraction of the full resolution
+        reader = QImageReader(self.path)
+        size = reader.size()
+        if size.isValid() and size.width() > PREVIEW_WIDTH:
+            reader.setScaledSize(QSize(
+                PREVIEW_WIDTH, max(1, size.height() * PREVIEW_WIDTH // size.width())))
+        img = reader.read()
+        if not img.isNull() and img.width() > PREVIEW_WIDTH:
+            img = img.scaledToWidth(PREVIEW_WIDTH, Qt.FastTransformation)
+        self.signals.ready.emit(self.path, img)
+
 # --- Main application window ------------------------------------------------
 
 class CleanupApp(QMainWindow):
@@ -121,12 +746,31 @@ class CleanupApp(QMainWindow):
         """)
 
         self.last_checked_row = None
+        # Rows below this are filled; the rest were reserved by started_rows
+        # and have no items until their batch arrives
+        self._next_row = 0
+        self._stale_scanners = []
+        # Running selection totals, so toggles never rescan the table
+        self._selected_bytes = 0
+        self._selected_count = 0
+
+        # Image previews decoded on the global thread pool
+        self.preview_signals = PreviewSignals()
+        self.preview_signals.ready.connect(self.on_preview_ready)
+        self._previews_pending = set()
+        self._previews_failed = set()
+        self._hover_path = None
 
         # Drive usage
         self.drive_label = QLabel("Drive Usage: Calculating...")
         self.drive_progress = QProgressBar()
         self.drive_progress.setMaximum(100)
-        self.update_drive_usage()
+        # Filled in once the window is up, then kept current as space is freed
+        self._drive_usage = None
+        QTimer.singleShot(0, self.update_drive_usage)
+        self._drive_timer = QTimer(self)
+        self._drive_timer.timeout.connect(self.update_drive_usage)
+        self._drive_timer.start(30_000)
 
         # Table
         self.table = QTableWidget(0, 8)
@@ -148,14 +792,25 @@ class CleanupApp(QMainWindow):
         self.table.setSortingEnabled(True)
         hdr.sectionClicked.connect(self.handle_header_click)
         self.table.cellClicked.connect(self.on_cell_clicked)
+        self.table.itemChanged.connect(self.on_item_changed)
+        self.table.viewport().installEventFilter(self)
+        self.table.setItemDelegate(DupDelegate(self.table))
 
         # Filter combobox
         self.ext_box = QComboBox()
         self.ext_box.addItem("All")
-        for ext in COMMON_EXTENSIONS:
+        for ext in sorted(COMMON_EXTENSIONS):
             self.ext_box.addItem(ext)
         self.ext_box.setFixedWidth(self.ext_box.sizeHint().width() + 40)
 
+        # Duplicate detection is the only part of a scan that reads files
+        self.dups_box = QCheckBox("Detect duplicates")
+        self.dups_box.setChecked(True)
+        # Reuse digests of files unchanged since an earlier scan
+        self.cache_box = QCheckBox("Use hash cache")
+        self.cache_box.setChecked(True)
+        self.dups_box.toggled.connect(self.cache_box.setEnabled)
+
         # Scan controls
         scan_btn = QPushButton("Scan for Space")
         scan_btn.clicked.connect(self.scan_files)
@@ -171,6 +826,8 @@ class CleanupApp(QMainWindow):
 
         ctrl_layout = QHBoxLayout()
         ctrl_layout.addWidget(self.ext_box)
+        ctrl_layout.addWidget(self.dups_box)
+        ctrl_layout.addWidget(self.cache_box)
         ctrl_layout.addWidget(scan_btn)
         ctrl_layout.addWidget(cancel_btn)
         ctrl_layout.addWidget(self.progress_bar)
@@ -180,13 +837,17 @@ class CleanupApp(QMainWindow):
         # Actions
         delete_btn  = QPushButton("Delete Selected");  delete_btn.clicked.connect(self.delete_selected)
         move_btn    = QPushButton("Move Selected");    move_btn.clicked.connect(self.move_selected)
+        self.move_btn = move_btn
         archive_btn = QPushButton("Archive Selected"); archive_btn.clicked.connect(self.archive_selected)
+        self.archive_btn = archive_btn
         reverse_btn = QPushButton("Reverse Archive");  reverse_btn.clicked.connect(self.reverse_archive)
+        self.fast_archive_box = QCheckBox("Fast archive (no recompress)")
 
         act_layout = QHBoxLayout()
         act_layout.addWidget(delete_btn)
         act_layout.addWidget(move_btn)
         act_layout.addWidget(archive_btn)
+        act_layout.addWidget(self.fast_archive_box)
         act_layout.addWidget(reverse_btn)
         act_layout.addWidget(self.space_saved_label)
         act_layout.addStretch()
@@ -205,6 +866,9 @@ class CleanupApp(QMainWindow):
 
     def update_drive_usage(self):
         usage = psutil.disk_usage(os.path.abspath(os.sep))
+        if (usage.used, usage.total) == self._drive_usage:
+            return
+        self._drive_usage = (usage.used, usage.total)
         pct = int(usage.percent)
         self.drive_label.setText(
             f"Drive Usage: {pct}% used — {human_readable_size(usage.used)} of {human_readable_size(usage.total)}"
@@ -222,14 +886,19 @@ class CleanupApp(QMainWindow):
         if idx == 0:
             self.table.setUpdatesEnabled(False)
             self.table.setSortingEnabled(False)
-            select_all = not all(
-                self.table.cellWidget(r,0).isChecked()
-                for r in range(self.table.rowCount())
-            )
-            for r in range(self.table.rowCount()):
-                self.table.cellWidget(r,0).setChecked(select_all)
+            filled = self._next_row
+            select_all = self._selected_count != filled
+            state = Qt.Checked if select_all else Qt.Unchecked
+            self.table.blockSignals(True)
+            for r in range(filled):
+                self.table.item(r,0).setCheckState(state)
+            self.table.blockSignals(False)
             sym = "☑" if select_all else "☐"
             self.table.horizontalHeaderItem(0).setText(sym)
+            self._selected_bytes = sum(
+                self.row_bytes(r) for r in range(filled)
+            ) if select_all else 0
+            self._selected_count = filled if select_all else 0
             self.update_space_label()
             self.table.setUpdatesEnabled(True)
             self.table.setSortingEnabled(True)
@@ -243,14 +912,34 @@ class CleanupApp(QMainWindow):
         filt = [] if ext=="All" else [ext]
         self.table.setUpdatesEnabled(False)
         self.table.setSortingEnabled(False)
+        self.retire_scanner()
         self.table.setRowCount(0)
-        self.scanner = FileScanner(folder, filt)
-        self.scanner.file_found.connect(self.add_file)
+        self._next_row = 0
+        self._selected_bytes = 0
+        self._selected_count = 0
+        self.update_space_label()
+        self.scanner = FileScanner(folder, filt, self.cache_box.isChecked(),
+                                   self.dups_box.isChecked())
+        self.scanner.started_rows.connect(self.table.setRowCount)
+        self.scanner.batch_ready.connect(self.add_files)
         self.scanner.progress.connect(self.progress_bar.setValue)
         self.scanner.finished.connect(self.on_scan_complete)
         self.scanner.start()
         self.cancel_btn.setEnabled(True)
 
+    def retire_scanner(self):
+        """Stop a scan still running and drop whatever it has yet to deliver."""
+        old = getattr(self, 'scanner', None)
+        if old is None or not old.isRunning():
+            return
+        old.stop()
+        # Disconnecting also discards signals already queued to this thread
+        for sig in (old.progress, old.started_rows, old.batch_ready, old.finished):
+            sig.disconnect()
+        # Keep a reference until its thread exits; Qt aborts on deleting it earlier
+        self._stale_scanners = [t for t in self._stale_scanners if t.isRunning()]
+        self._stale_scanners.append(old)
+
     def cancel_scan(self):
         if hasattr(self, 'scanner'):
             self.scanner.stop()
@@ -259,25 +948,45 @@ class CleanupApp(QMainWindow):
 
     def on_scan_complete(self):
         self.status_label.setText("Done.")
+        # Drop rows reserved for files a cancelled scan never reached
+        self.table.setRowCount(self._next_row)
         self.table.setUpdatesEnabled(True)
         self.table.setSortingEnabled(True)
         self.cancel_btn.setEnabled(False)
 
-    def add_file(self, name, size, path, archived, duplicate_of):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        chk = QCheckBox()
-        chk.clicked.connect(lambda checked, r=row: self.on_checkbox_clicked(r, checked))
-        self.table.setCellWidget(row, 0, chk)
+    def add_files(self, batch):
+        # Fill rows reserved by started_rows (growing only if a batch
+        # arrives without them); scan_files keeps repaints off until the
+        # scan completes. Sorting must be off while a row is half filled,
+        # or it moves away mid-row, and new items are not selection changes.
+        sorting = self.table.isSortingEnabled()
+        self.table.setSortingEnabled(False)
+        self.table.blockSignals(True)
+        row = self._next_row
+        if row + len(batch) > self.table.rowCount():
+            self.table.setRowCount(row + len(batch))
+        for fields in batch:
+            self.add_file(row, *fields)
+            row += 1
+        self.table.blockSignals(False)
+        self.table.setSortingEnabled(sorting)
+        self._next_row = row
+
+    def add_file(self, row, name, ext, size, path, archived, duplicate_of, mtime):
+        # A checkable item rather than a QCheckBox widget per row
+        chk = QTableWidgetItem()
+        chk.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+        chk.setCheckState(Qt.Unchecked)
+        self.table.setItem(row, 0, chk)
 
-        item_name = QTableWidgetItem(name)
-        if path.lower().endswith(('.png','.jpg','.jpeg','.gif','.bmp')):
-            item_name.setToolTip(f"<img src='{path}' width='200'>")
-        self.table.setItem(row, 1, item_name)
+        self.table.setItem(row, 1, QTableWidgetItem(name))
 
-        ext = os.path.splitext(path)[1].lower()
         self.table.setItem(row, 2, QTableWidgetItem(ext))
-        self.table.setItem(row, 3, SizeItem(human_readable_size(size)))
+        size_item = SortItem(human_readable_size(size))
+        size_item.setData(Qt.UserRole, size)
+        if duplicate_of:
+            size_item.setData(DUP_ROLE, True)
+        self.table.setItem(row, 3, size_item)
 
         max_len = 60
         display = path if len(path)<=max_len else f"...{path[-(max_len-3):]}"
@@ -287,50 +996,116 @@ class CleanupApp(QMainWindow):
 
         self.table.setItem(row, 5, QTableWidgetItem(archived))
         try:
-            mod = datetime.datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M')
-        except:
+            mod = datetime.datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M')
+        except (OverflowError, OSError, ValueError):
             mod = ""
-        self.table.setItem(row, 6, QTableWidgetItem(mod))
+        mod_item = SortItem(mod)
+        mod_item.setData(Qt.UserRole, mtime)
+        self.table.setItem(row, 6, mod_item)
         self.table.setItem(row, 7, QTableWidgetItem(duplicate_of))
 
-        if duplicate_of:
-            for c in range(8):
-                itm = self.table.item(row,c)
-                itm.setBackground(QColor("#800000"))
+    def eventFilter(self, obj, event):
+        # Image previews are built on hover rather than per row at scan time
+        if event.type() == QEvent.ToolTip and obj is self.table.viewport():
+            idx = self.table.indexAt(event.pos())
+            if (idx.column() == 1 and idx.row() < self._next_row
+                    and self.table.item(idx.row(), 2).text() in PREVIEW_EXTENSIONS):
+                path = self.table.item(idx.row(), 4).toolTip()
+                if path not in self._previews_failed:
+                    self._hover_path = path
+                    html = self.preview_html(path)
+                    if html is None:
+                        self.request_preview(path)
+                        html = "Loading preview..."
+                    QToolTip.showText(event.globalPos(), html, obj)
+                    return True
+        return super().eventFilter(obj, event)
+
+    def request_preview(self, path):
+        if path not in self._previews_pending:
+            self._previews_pending.add(path)
+            QThreadPool.globalInstance().start(PreviewTask(path, self.preview_signals))
+
+    def on_preview_ready(self, path, img):
+        self._previews_pending.discard(path)
+        if img.isNull():
+            self._previews_failed.add(path)
+            if path == self._hover_path:
+                QToolTip.hideText()
+            return
+        QPixmapCache.insert(path, QPixmap.fromImage(img))
+        # Swap the placeholder if the pointer is still on this row
+        if path == self._hover_path and QToolTip.isVisible():
+            QToolTip.showText(QCursor.pos(), self.preview_html(path), self.table.viewport())
+
+    def preview_html(self, path):
+        """Tooltip markup for a cached image preview, or None if not decoded yet."""
+        pix = QPixmapCache.find(path)
+        if pix is None or pix.isNull():
+            return None
+        data = QByteArray()
+        buf = QBuffer(data)
+        buf.open(QIODevice.WriteOnly)
+        pix.save(buf, 'PNG')
+        return f"<img src='data:image/png;base64,{bytes(data.toBase64()).decode()}'>"
+
+    def on_item_changed(self, item):
+        # item.row() is the current row, so this holds after sorting
+        if item.column() == 0:
+            self.on_checkbox_clicked(item.row(), item.checkState() == Qt.Checked)
 
     def on_checkbox_clicked(self, row, checked):
         mods = QApplication.keyboardModifiers()
+        sign = 1 if checked else -1
+        self._selected_bytes += sign * self.row_bytes(row)
+        self._selected_count += sign
         if mods & Qt.ShiftModifier and self.last_checked_row is not None:
             start, end = sorted([row, self.last_checked_row])
+            end = min(end, self._next_row - 1)  # rows may have been deleted since
+            state = Qt.Checked if checked else Qt.Unchecked
+            self.table.blockSignals(True)
             for r in range(start, end+1):
-                cb = self.table.cellWidget(r,0)
-                cb.blockSignals(True)
-                cb.setChecked(checked)
-                cb.blockSignals(False)
+                cb = self.table.item(r,0)
+                if cb.checkState() == state:
+                    continue
+                cb.setCheckState(state)
+                self._selected_bytes += sign * self.row_bytes(r)
+                self._selected_count += sign
+            self.table.blockSignals(False)
         self.last_checked_row = row
         self.update_space_label()
 
     def on_cell_clicked(self, row, col):
-        if col==4:
+        if col==4 and row < self._next_row:
             full = self.table.item(row,4).toolTip()
             folder = os.path.dirname(full)
             try:
-                if sys.platform.startswith('win'): os.startfile(folder)
-                elif sys.platform.startswith('darwin'): subprocess.Popen(['open',folder])
-                else: subprocess.Popen(['xdg-open',folder])
-            except: pass
+                open_folder(folder)
+            except OSError as e:
+                log.warning("could not open %s: %s", folder, e)
 
     def get_selected_rows(self):
-        return [r for r in range(self.table.rowCount())
-                if self.table.cellWidget(r,0).isChecked()]
+        # _selected_count answers the none/all cases (header toggle) without
+        # touching any item, and lets the scan stop at the last checked row
+        n = self._next_row
+        if self._selected_count <= 0:
+            return []
+        if self._selected_count >= n:
+            return list(range(n))
+        rows = []
+        for r in range(n):
+            if self.table.item(r,0).checkState() == Qt.Checked:
+                rows.append(r)
+                if len(rows) == self._selected_count:
+                    break
+        return rows
+
+    def row_bytes(self, row):
+        return self.table.item(row, 3).data(Qt.UserRole)
 
     def update_space_label(self):
-        unit_map = {'B':1/1024**2,'KB':1/1024,'MB':1,'GB':1024,'TB':1024**2}
-        total=0.0
-        for r in self.get_selected_rows():
-            text=self.table.item(r,3).text()
-            num,unit=text.split()
-            total+=float(num)*unit_map.get(unit,1)
+        # Running total kept by the selection handlers, so this is O(1)
+        total = self._selected_bytes / 1024**2
         self.space_saved_label.setText(f"Space to be freed: {total:.2f} MB")
 
     def delete_selected(self):
@@ -338,20 +1113,42 @@ class CleanupApp(QMainWindow):
             full=self.table.item(r,4).toolTip()
             try:
                 os.remove(full)
-                self.table.removeRow(r)
-            except: pass
+            except OSError as e:
+                log.warning("could not delete %s: %s", full, e)
+                continue
+            self._selected_bytes -= self.row_bytes(r)
+            self._selected_count -= 1
+            self.table.removeRow(r)
+            self._next_row -= 1
         self.update_space_label()
 
     def move_selected(self):
         dest=QFileDialog.getExistingDirectory(self,"Select Destination",os.path.expanduser("~/Downloads"),QFileDialog.ShowDirsOnly)
         if not dest: return
+        # Path items move with sorting, so track them rather than row numbers
+        self._moving = {}
         for r in self.get_selected_rows():
-            full=self.table.item(r,4).toolTip()
-            try:
-                newp=shutil.move(full,dest)
-                disp=newp if len(newp)<=60 else f"...{newp[-57:]}"
-                itm=self.table.item(r,4); itm.setText(disp); itm.setToolTip(newp)
-            except: pass
+            itm=self.table.item(r,4)
+            self._moving[itm.toolTip()]=itm
+        # One move at a time: a second would replace _moving and the running
+        # worker under the first one's feet
+        self.move_btn.setEnabled(False)
+        self.mover=MoveWorker(list(self._moving),dest)
+        self.mover.moved.connect(self.on_file_moved)
+        self.mover.finished.connect(lambda: self.status_label.setText("Move complete"))
+        self.mover.finished.connect(lambda: self.move_btn.setEnabled(True))
+        self.status_label.setText("Moving...")
+        self.mover.start()
+
+    def on_file_moved(self, old, new):
+        itm=self._moving.pop(old, None)
+        if itm is None:
+            return
+        disp=new if len(new)<=60 else f"...{new[-57:]}"
+        try:
+            itm.setText(disp); itm.setToolTip(new)
+        except RuntimeError:
+            pass  # row deleted or table rescanned while the move ran
 
     def archive_selected(self):
         mode,ok=QInputDialog.getItem(
@@ -360,71 +1157,65 @@ class CleanupApp(QMainWindow):
         if not ok: return
         base=QFileDialog.getExistingDirectory(self,"Choose Output Folder",os.path.expanduser("~/Downloads"),QFileDialog.ShowDirsOnly)
         if not base: return
-        files=[self.table.item(r,4).toolTip() for r in self.get_selected_rows()]
+        rows=self.get_selected_rows()
+        files=[self.table.item(r,4).toolTip() for r in rows]
+        store=self.fast_archive_box.isChecked()
 
         if mode=="Single File":
             default=os.path.join(base,f"archive_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
             out,_=QFileDialog.getSaveFileName(self,"Save Archive As",default,"Zip Files (*.zip)")
             if not out: return
-            seen=set();man={}
-            with zipfile.ZipFile(out,'w',zipfile.ZIP_DEFLATED) as zf:
-                for i,f in enumerate(files):
-                    name=os.path.basename(f)
-                    arc=name if name not in seen else f"{i}_{name}"
-                    seen.add(arc)
-                    zf.write(f,arc);man[arc]=f;os.remove(f)
-                zf.writestr("manifest.json",json.dumps(man,indent=2))
-            self.status_label.setText(f"Archived to {out}")
+            parts=[(out,files)]
+            msg=f"Archived to {out}"
 
         elif mode=="By Max Size":
             size_mb,ok=QInputDialog.getDouble(self,"Max Zip Size","Enter max size (MB):",100,1)
             if not ok: return
             max_bytes=size_mb*1024**2
-            part=1;cur=0;seen=set();zf=None
-            for i,f in enumerate(files):
-                sz=os.path.getsize(f)
-                if zf is None or cur+sz>max_bytes:
-                    if zf:zf.writestr("manifest.json",json.dumps(man,indent=2));zf.close()
-                    out=os.path.join(base,f"archive_part{part}.zip");part+=1
-                    zf=zipfile.ZipFile(out,'w',zipfile.ZIP_DEFLATED);cur=0;seen.clear();man={}
-                name=os.path.basename(f)
-                arc=name if name not in seen else f"{i}_{name}"
-                seen.add(arc);zf.write(f,arc);man[arc]=f;os.remove(f);cur+=sz
-            if zf:zf.writestr("manifest.json",json.dumps(man,indent=2));zf.close()
-            self.status_label.setText("Archived by size parts")
+            # Part boundaries from the sizes recorded by the scan; no restat
+            parts=[];cur=0
+            for f,r in zip(files,rows):
+                sz=self.row_bytes(r)
+                if not parts or cur+sz>max_bytes:
+                    parts.append((os.path.join(base,f"archive_part{len(parts)+1}.zip"),[]));cur=0
+                parts[-1][1].append(f);cur+=sz
+            msg="Archived by size parts"
 
         elif mode=="By File Count":
             count,ok=QInputDialog.getInt(self,"Group Size","Files per archive:",50,1)
             if not ok: return
-            for idx in range(0,len(files),count):
-                grp=files[idx:idx+count]
-                out=os.path.join(base,f"archive_group{idx//count+1}.zip")
-                with zipfile.ZipFile(out,'w',zipfile.ZIP_DEFLATED) as zf:
-                    man={};seen=set()
-                    for i,f in enumerate(grp):
-                        name=os.path.basename(f)
-                        arc=name if name not in seen else f"{i}_{name}"
-                        seen.add(arc);zf.write(f,arc);man[arc]=f;os.remove(f)
-                    zf.writestr("manifest.json",json.dumps(man,indent=2))
-            self.status_label.setText("Archived by count groups")
+            parts=[(os.path.join(base,f"archive_group{idx//count+1}.zip"),files[idx:idx+count])
+                   for idx in range(0,len(files),count)]
+            msg="Archived by count groups"
 
         elif mode=="By File Type":
             groups={}
             for f in files:
                 ext=os.path.splitext(f)[1].lower().lstrip('.')
                 groups.setdefault(ext,[]).append(f)
-            for ext,flist in groups.items():
-                out=os.path.join(base,f"archive_{ext}.zip")
-                with zipfile.ZipFile(out,'w',zipfile.ZIP_DEFLATED) as zf:
-                    man={};seen=set()
-                    for i,f in enumerate(flist):
-                        name=os.path.basename(f)
-                        arc=name if name not in seen else f"{i}_{name}"
-                        seen.add(arc);zf.write(f,arc);man[arc]=f;os.remove(f)
-                    zf.writestr("manifest.json",json.dumps(man,indent=2))
-            self.status_label.setText("Archived by file type")
+            parts=[(os.path.join(base,f"archive_{ext}.zip"),flist) for ext,flist in groups.items()]
+            msg="Archived by file type"
 
-        self.update_space_label()
+        # Archived flags go on items, which stay put if the table is re-sorted
+        self._archiving={f:self.table.item(r,5) for f,r in zip(files,rows)}
+        # One archive job at a time, as with moves
+        self.archive_btn.setEnabled(False)
+        self.archiver=ArchiveWorker(parts,store)
+        self.archiver.part_done.connect(self.on_part_archived)
+        self.archiver.finished.connect(lambda: self.status_label.setText(msg))
+        self.archiver.finished.connect(self.update_space_label)
+        self.archiver.finished.connect(lambda: self.archive_btn.setEnabled(True))
+        self.status_label.setText("Archiving...")
+        self.archiver.start()
+
+    def on_part_archived(self, out, paths):
+        for f in paths:
+            itm = self._archiving.pop(f, None)
+            try:
+                if itm is not None:
+                    itm.setText("Yes")
+            except RuntimeError:
+                pass  # row deleted or table rescanned while archiving
 
     def reverse_archive(self):
         zip_path,_=QFileDialog.getOpenFileName(self,"Select Archive to Reverse",os.path.expanduser("~/Downloads"),"Zip Files (*.zip)")
@@ -432,13 +1223,14 @@ class CleanupApp(QMainWindow):
         dest=QFileDialog.getExistingDirectory(self,"Choose Restore Folder",os.path.dirname(zip_path),QFileDialog.ShowDirsOnly)
         if not dest: return
         try:
-            with zipfile.ZipFile(zip_path,'r') as zf:
-                zf.extractall(dest)
+            extract_zip(zip_path,dest)
             QMessageBox.information(self,"Restore Complete",f"Files restored to {dest}")
         except Exception as e:
             QMessageBox.warning(self,"Restore Failed",str(e))
 
 if __name__ == "__main__":
+    # SPACESAVER_LOG=DEBUG lists every file skipped during a scan
+    logging.basicConfig(level=os.environ.get('SPACESAVER_LOG', 'WARNING').upper())
     app = QApplication(sys.argv)
     window = CleanupApp()
     window.resize(1200, 800)